@@ -0,0 +1,67 @@
+"""default timestamp columns to now()
+
+Revision ID: 142f6e59b685
+Revises: 3dbc17bfe2db
+Create Date: 2026-10-15 09:52:04.733190
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '142f6e59b685'
+down_revision = '3dbc17bfe2db'
+branch_labels = None
+depends_on = None
+
+# Tables built on BaseModel, which carries created and lastupdated
+BASE_TABLES = (
+    'action',
+    'agent',
+    'argument',
+    'call',
+    'container',
+    'deployment',
+    'event',
+    'file',
+    'flow',
+    'gate',
+    'network',
+    'node',
+    'passwords',
+    'plug',
+    'privilege',
+    'processor',
+    'queue',
+    'role',
+    'scheduler',
+    'settings',
+    'socket',
+    'task',
+    'users',
+    'work',
+    'worker',
+)
+
+TIMESTAMP_COLUMNS = dict(
+    {table: ('created', 'lastupdated') for table in BASE_TABLES},
+    call=('created', 'lastupdated', 'started'),
+    log=('created',),
+    login=('created', 'lastupdated', 'login'),
+    versions=('version',),
+)
+
+
+def upgrade():
+    # The models no longer send these values on INSERT, so the database has to
+    # fill them in
+    for table, columns in TIMESTAMP_COLUMNS.items():
+        for column in columns:
+            op.alter_column(table, column, server_default=sa.text('now()'))
+
+
+def downgrade():
+    for table, columns in TIMESTAMP_COLUMNS.items():
+        for column in columns:
+            op.alter_column(table, column, server_default=None)
@@ -0,0 +1,50 @@
+"""add processor_stats materialized view
+
+Revision ID: 1ad4356ca480
+Revises: 142f6e59b685
+Create Date: 2026-10-15 11:05:19.447730
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '1ad4356ca480'
+down_revision = '142f6e59b685'
+branch_labels = None
+depends_on = None
+
+# Frozen copy of the view definition as of this revision
+PROCESSOR_STATS_SQL = """
+SELECT p.id,
+       COALESCE(pl.n, 0) AS plug_count,
+       COALESCE(s.n, 0) AS socket_count,
+       COALESCE(d.n, 0) AS deployment_count,
+       COALESCE(w.n, 0) AS running_workers
+FROM processor p
+LEFT JOIN (SELECT processor_id, COUNT(*) AS n FROM plug GROUP BY processor_id) pl
+       ON pl.processor_id = p.id
+LEFT JOIN (SELECT processor_id, COUNT(*) AS n FROM socket GROUP BY processor_id) s
+       ON s.processor_id = p.id
+LEFT JOIN (SELECT processor_id, COUNT(*) AS n FROM deployment GROUP BY processor_id) d
+       ON d.processor_id = p.id
+LEFT JOIN (SELECT processor_id, COUNT(*) AS n FROM worker
+           WHERE status = 'running' GROUP BY processor_id) w
+       ON w.processor_id = p.id
+"""
+
+
+def upgrade():
+    op.execute(
+        'CREATE MATERIALIZED VIEW IF NOT EXISTS processor_stats AS '
+        + PROCESSOR_STATS_SQL
+    )
+    # REFRESH ... CONCURRENTLY requires a unique index on the view
+    op.execute(
+        'CREATE UNIQUE INDEX IF NOT EXISTS ix_processor_stats_id '
+        'ON processor_stats (id)'
+    )
+
+
+def downgrade():
+    op.execute('DROP MATERIALIZED VIEW IF EXISTS processor_stats')
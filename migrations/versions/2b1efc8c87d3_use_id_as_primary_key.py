@@ -0,0 +1,74 @@
+"""use id as the sole primary key
+
+Revision ID: 2b1efc8c87d3
+Revises: d2d2583636bd
+Create Date: 2026-10-15 09:47:30.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2b1efc8c87d3'
+down_revision = 'd2d2583636bd'
+branch_labels = None
+depends_on = None
+
+# Tables whose primary key was (id, name), as the models stood at this
+# revision
+NAMED_TABLES = (
+    'action',
+    'agent',
+    'argument',
+    'call',
+    'container',
+    'deployment',
+    'event',
+    'file',
+    'flow',
+    'gate',
+    'network',
+    'node',
+    'passwords',
+    'plug',
+    'privilege',
+    'processor',
+    'queue',
+    'role',
+    'scheduler',
+    'settings',
+    'socket',
+    'users',
+    'work',
+    'worker',
+)
+
+# table -> (old primary key columns, column that must stay unique)
+PRIMARY_KEYS = dict(
+    {table: (('id', 'name'), 'name') for table in NAMED_TABLES},
+    task=(('id', 'name', 'module', 'gitrepo'), 'name'),
+    log=(('id', 'oid'), None),
+    login=(('id', 'token'), 'token'),
+)
+
+
+def upgrade():
+    # The existing <table>_id_key unique constraints stay: every foreign key
+    # in the schema depends on them
+    for table, (_, unique) in PRIMARY_KEYS.items():
+        op.drop_constraint(f'{table}_pkey', table, type_='primary')
+        op.create_primary_key(f'{table}_pkey', table, ['id'])
+
+        if unique:
+            # No longer implied by the primary key, so make sure it exists
+            op.execute(
+                f'ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {table}_{unique}_key'
+            )
+            op.create_unique_constraint(f'{table}_{unique}_key', table, [unique])
+
+
+def downgrade():
+    for table, (columns, _) in PRIMARY_KEYS.items():
+        op.drop_constraint(f'{table}_pkey', table, type_='primary')
+        op.create_primary_key(f'{table}_pkey', table, list(columns))
@@ -0,0 +1,147 @@
+"""add rights masks to roles and users
+
+Revision ID: 2d01737671af
+Revises: 8872ef9e1c1e
+Create Date: 2026-10-15 10:20:41.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '2d01737671af'
+down_revision = '8872ef9e1c1e'
+branch_labels = None
+depends_on = None
+
+MASK_COLUMNS = (
+    ('role', 'rights', 'role_privileges', 'role_id'),
+    ('users', 'rights_granted', 'user_privileges', 'user_id'),
+    ('users', 'rights_revoked', 'user_privileges_revoked', 'user_id'),
+)
+
+# Frozen copy of the Right flags as of this revision, in bit order, so the
+# migration does not change when the model does
+RIGHTS = (
+    'ALL',
+    'CREATE',
+    'READ',
+    'UPDATE',
+    'DELETE',
+    'DB_DROP',
+    'DB_INIT',
+    'START_AGENT',
+    'RUN_TASK',
+    'CANCEL_TASK',
+    'START_PROCESSOR',
+    'STOP_PROCESSOR',
+    'PAUSE_PROCESSOR',
+    'RESUME_PROCESSOR',
+    'LOCK_PROCESSOR',
+    'UNLOCK_PROCESSOR',
+    'VIEW_PROCESSOR',
+    'VIEW_PROCESSOR_CONFIG',
+    'VIEW_PROCESSOR_CODE',
+    'EDIT_PROCESSOR_CONFIG',
+    'EDIT_PROCESSOR_CODE',
+    'LS_PROCESSORS',
+    'LS_USERS',
+    'LS_USER',
+    'LS_PLUGS',
+    'LS_SOCKETS',
+    'LS_QUEUES',
+    'LS_AGENTS',
+    'LS_NODES',
+    'LS_SCHEDULERS',
+    'LS_WORKERS',
+    'ADD_PROCESSOR',
+    'ADD_AGENT',
+    'ADD_NODE',
+    'ADD_PLUG',
+    'ADD_PRIVILEGE',
+    'ADD_QUEUE',
+    'ADD_ROLE',
+    'ADD_SCHEDULER',
+    'ADD_SOCKET',
+    'ADD_USER',
+    'UPDATE_PROCESSOR',
+    'UPDATE_AGENT',
+    'UPDATE_NODE',
+    'UPDATE_PLUG',
+    'UPDATE_ROLE',
+    'UPDATE_SCHEDULER',
+    'UPDATE_SOCKET',
+    'UPDATE_USER',
+    'DELETE_PROCESSOR',
+    'DELETE_AGENT',
+    'DELETE_NODE',
+    'DELETE_PLUG',
+    'DELETE_PRIVILEGE',
+    'DELETE_QUEUE',
+    'DELETE_ROLE',
+    'DELETE_SCHEDULER',
+    'DELETE_SOCKET',
+    'DELETE_USER',
+    'READ_PROCESSOR',
+    'READ_AGENT',
+    'READ_NODE',
+    'READ_LOG',
+    'READ_PLUG',
+    'READ_PRIVILEGE',
+    'READ_QUEUE',
+    'READ_ROLE',
+    'READ_SCHEDULER',
+    'READ_SOCKET',
+    'READ_USER',
+)
+RIGHTS_WIDTH = 128
+NO_RIGHTS = sa.text(f'0::bit({RIGHTS_WIDTH})')
+
+LABEL_BITS = {label: 1 << bit for bit, label in enumerate(RIGHTS)}
+# Privilege rows may still carry the label the old rights list produced by
+# concatenating two names; it granted both
+LABEL_BITS['EDIT_PROCESSOR_CODELS_PROCESSORS'] = (
+    LABEL_BITS['EDIT_PROCESSOR_CODE'] | LABEL_BITS['LS_PROCESSORS']
+)
+
+
+def upgrade():
+    for table, column, _, _ in MASK_COLUMNS:
+        op.add_column(
+            table,
+            sa.Column(
+                column,
+                postgresql.BIT(RIGHTS_WIDTH),
+                nullable=False,
+                server_default=NO_RIGHTS,
+            ),
+        )
+
+    conn = op.get_bind()
+
+    for table, column, association, owner in MASK_COLUMNS:
+        masks = {}
+        rows = conn.execute(
+            sa.text(
+                f'SELECT a.{owner}, p."right"::text FROM {association} a '
+                'JOIN privilege p ON p.id = a.privilege_id'
+            )
+        )
+        for owner_id, label in rows:
+            masks[owner_id] = masks.get(owner_id, 0) | LABEL_BITS.get(label, 0)
+
+        update = sa.text(
+            f'UPDATE {table} SET {column} = CAST(:mask AS bit({RIGHTS_WIDTH})) '
+            'WHERE id = :id'
+        )
+        for owner_id, mask in masks.items():
+            conn.execute(
+                update, {'id': owner_id, 'mask': format(mask, f'0{RIGHTS_WIDTH}b')}
+            )
+
+
+def downgrade():
+    for table, column, _, _ in reversed(MASK_COLUMNS):
+        op.drop_column(table, column)
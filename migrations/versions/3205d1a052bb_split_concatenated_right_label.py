@@ -0,0 +1,158 @@
+"""split the concatenated EDIT_PROCESSOR_CODE/LS_PROCESSORS right label
+
+Revision ID: 3205d1a052bb
+Revises: db033c49cfb4
+Create Date: 2026-10-15 11:21:08.775301
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3205d1a052bb'
+down_revision = 'db033c49cfb4'
+branch_labels = None
+depends_on = None
+
+# Frozen copy of the right labels as of this revision
+RIGHTS = (
+    'ALL',
+    'CREATE',
+    'READ',
+    'UPDATE',
+    'DELETE',
+    'DB_DROP',
+    'DB_INIT',
+    'START_AGENT',
+    'RUN_TASK',
+    'CANCEL_TASK',
+    'START_PROCESSOR',
+    'STOP_PROCESSOR',
+    'PAUSE_PROCESSOR',
+    'RESUME_PROCESSOR',
+    'LOCK_PROCESSOR',
+    'UNLOCK_PROCESSOR',
+    'VIEW_PROCESSOR',
+    'VIEW_PROCESSOR_CONFIG',
+    'VIEW_PROCESSOR_CODE',
+    'EDIT_PROCESSOR_CONFIG',
+    'EDIT_PROCESSOR_CODE',
+    'LS_PROCESSORS',
+    'LS_USERS',
+    'LS_USER',
+    'LS_PLUGS',
+    'LS_SOCKETS',
+    'LS_QUEUES',
+    'LS_AGENTS',
+    'LS_NODES',
+    'LS_SCHEDULERS',
+    'LS_WORKERS',
+    'ADD_PROCESSOR',
+    'ADD_AGENT',
+    'ADD_NODE',
+    'ADD_PLUG',
+    'ADD_PRIVILEGE',
+    'ADD_QUEUE',
+    'ADD_ROLE',
+    'ADD_SCHEDULER',
+    'ADD_SOCKET',
+    'ADD_USER',
+    'UPDATE_PROCESSOR',
+    'UPDATE_AGENT',
+    'UPDATE_NODE',
+    'UPDATE_PLUG',
+    'UPDATE_ROLE',
+    'UPDATE_SCHEDULER',
+    'UPDATE_SOCKET',
+    'UPDATE_USER',
+    'DELETE_PROCESSOR',
+    'DELETE_AGENT',
+    'DELETE_NODE',
+    'DELETE_PLUG',
+    'DELETE_PRIVILEGE',
+    'DELETE_QUEUE',
+    'DELETE_ROLE',
+    'DELETE_SCHEDULER',
+    'DELETE_SOCKET',
+    'DELETE_USER',
+    'READ_PROCESSOR',
+    'READ_AGENT',
+    'READ_NODE',
+    'READ_LOG',
+    'READ_PLUG',
+    'READ_PRIVILEGE',
+    'READ_QUEUE',
+    'READ_ROLE',
+    'READ_SCHEDULER',
+    'READ_SOCKET',
+    'READ_USER',
+)
+
+LEGACY_LABEL = 'EDIT_PROCESSOR_CODELS_PROCESSORS'
+SPLIT_LABELS = ('EDIT_PROCESSOR_CODE', 'LS_PROCESSORS')
+
+LEGACY_RIGHTS = tuple(
+    LEGACY_LABEL if label == SPLIT_LABELS[0] else label
+    for label in RIGHTS
+    if label != SPLIT_LABELS[1]
+)
+
+ASSOCIATIONS = (
+    ('role_privileges', 'role_id'),
+    ('user_privileges', 'user_id'),
+    ('user_privileges_revoked', 'user_id'),
+)
+
+
+def _recreate_type(labels, using):
+    # Enum labels cannot be dropped, so the type is rebuilt with the new
+    # label set and the column cast across
+    op.execute('ALTER TYPE "right" RENAME TO right_old')
+    sa.Enum(*labels, name='right').create(op.get_bind())
+    op.execute(
+        'ALTER TABLE privilege ALTER COLUMN "right" TYPE "right" '
+        f'USING ({using})::"right"'
+    )
+    op.execute('DROP TYPE right_old')
+
+
+def upgrade():
+    # A legacy privilege granted both rights. It keeps the first, and a copy
+    # holding the second is attached to the same roles and users
+    op.execute(
+        'CREATE TEMP TABLE privilege_split AS '
+        'SELECT id AS old_id, uuid_generate_v4() AS new_id FROM privilege '
+        f"WHERE \"right\"::text = '{LEGACY_LABEL}'"
+    )
+
+    _recreate_type(
+        RIGHTS,
+        f"CASE \"right\"::text WHEN '{LEGACY_LABEL}' THEN '{SPLIT_LABELS[0]}' "
+        'ELSE "right"::text END',
+    )
+
+    op.execute(
+        'INSERT INTO privilege (id, owner, created, lastupdated, name, status, '
+        'requested_status, enabled, "right") '
+        "SELECT s.new_id, p.owner, p.created, p.lastupdated, "
+        f"p.name || '.{SPLIT_LABELS[1]}', p.status, p.requested_status, "
+        f"p.enabled, '{SPLIT_LABELS[1]}' "
+        'FROM privilege p JOIN privilege_split s ON s.old_id = p.id'
+    )
+    for table, owner in ASSOCIATIONS:
+        op.execute(
+            f'INSERT INTO {table} ({owner}, privilege_id) '
+            f'SELECT a.{owner}, s.new_id FROM {table} a '
+            'JOIN privilege_split s ON s.old_id = a.privilege_id'
+        )
+
+    op.execute('DROP TABLE privilege_split')
+
+
+def downgrade():
+    _recreate_type(
+        LEGACY_RIGHTS,
+        f"CASE WHEN \"right\"::text IN {SPLIT_LABELS} THEN '{LEGACY_LABEL}' "
+        'ELSE "right"::text END',
+    )
@@ -0,0 +1,111 @@
+"""store ids and foreign keys as uuid
+
+Revision ID: 3dbc17bfe2db
+Revises: e00f07a45746
+Create Date: 2026-10-15 10:34:12.902517
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '3dbc17bfe2db'
+down_revision = 'e00f07a45746'
+branch_labels = None
+depends_on = None
+
+UUID_COLUMNS = {
+    'action': ('id',),
+    'agent': ('id', 'node_id'),
+    'argument': ('id', 'task_id', 'user_id'),
+    'call': ('id', 'task_id', 'socket_id'),
+    'calls_events': ('call_id', 'event_id'),
+    'container': ('id',),
+    'deployment': ('id', 'processor_id'),
+    'event': ('id', 'call_id'),
+    'file': ('id', 'user_id'),
+    'flow': ('id', 'file_id'),
+    'flows_versions': ('flow_id', 'version_id'),
+    'gate': ('id', 'task_id'),
+    'log': ('id', 'user_id', 'oid'),
+    'login': ('id', 'user_id'),
+    'network': ('id', 'user_id'),
+    'node': ('id', 'scheduler_id', 'network_id'),
+    'passwords': ('id',),
+    'plug': ('id', 'processor_id', 'argument_id', 'user_id'),
+    'plugs_arguments': ('plug_id', 'argument_id'),
+    'plugs_queues': ('plug_id', 'queue_id'),
+    'plugs_source_sockets': ('plug_id', 'socket_id'),
+    'plugs_target_sockets': ('plug_id', 'socket_id'),
+    'privilege': ('id',),
+    'processor': ('id', 'user_id', 'flow_id', 'password_id'),
+    'queue': ('id', 'network_id'),
+    'role': ('id',),
+    'role_privileges': ('role_id', 'privilege_id'),
+    'scheduler': ('id', 'network_id'),
+    'settings': ('id',),
+    'socket': ('id', 'processor_id', 'task_id', 'user_id'),
+    'sockets_queues': ('socket_id', 'queue_id'),
+    'task': ('id',),
+    'user_privileges': ('user_id', 'privilege_id'),
+    'user_privileges_revoked': ('user_id', 'privilege_id'),
+    'user_roles': ('user_id', 'role_id'),
+    'users': ('id',),
+    'versions': ('id', 'file_id'),
+    'work': ('id', 'task_id'),
+    'worker': ('id', 'processor_id', 'deployment_id', 'agent_id'),
+}
+
+
+def _foreign_keys(inspector):
+    """FKs between the converted columns; both ends must change type together"""
+    fks = []
+    for table in UUID_COLUMNS:
+        for fk in inspector.get_foreign_keys(table):
+            if set(fk['constrained_columns']) <= set(UUID_COLUMNS[table]):
+                fks.append((table, fk))
+
+    return fks
+
+
+def _convert(to_type, using):
+    inspector = sa.inspect(op.get_bind())
+    fks = _foreign_keys(inspector)
+
+    for table, fk in fks:
+        op.drop_constraint(fk['name'], table, type_='foreignkey')
+
+    for table, columns in UUID_COLUMNS.items():
+        current = {c['name']: c['type'] for c in inspector.get_columns(table)}
+        for column in columns:
+            # Databases built by create_all after the model change already
+            # have uuid columns
+            if isinstance(current[column], type(to_type)):
+                continue
+
+            op.alter_column(
+                table,
+                column,
+                type_=to_type,
+                postgresql_using=using.format(column=column),
+            )
+
+    for table, fk in fks:
+        op.create_foreign_key(
+            fk['name'],
+            table,
+            fk['referred_table'],
+            fk['constrained_columns'],
+            fk['referred_columns'],
+            **fk['options'],
+        )
+
+
+def upgrade():
+    _convert(postgresql.UUID(as_uuid=False), 'NULLIF({column}, \'\')::uuid')
+
+
+def downgrade():
+    _convert(sa.String(40), '{column}::text')
@@ -0,0 +1,28 @@
+"""index the log and login join columns
+
+Revision ID: 8872ef9e1c1e
+Revises: 2b1efc8c87d3
+Create Date: 2026-10-15 09:48:35.402716
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8872ef9e1c1e'
+down_revision = '2b1efc8c87d3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_log_oid_disc', 'log', ['oid', 'discriminator'])
+    op.create_index(
+        'ix_login_user_id_created', 'login', ['user_id', sa.text('created DESC')]
+    )
+
+
+def downgrade():
+    op.drop_index('ix_login_user_id_created', table_name='login')
+    op.drop_index('ix_log_oid_disc', table_name='log')
@@ -0,0 +1,39 @@
+"""index the hot child lookups
+
+Revision ID: db033c49cfb4
+Revises: e2b2053b8219
+Create Date: 2026-10-15 09:54:51.560329
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'db033c49cfb4'
+down_revision = 'e2b2053b8219'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        'ix_worker_proc_status',
+        'worker',
+        ['processor_id', 'status'],
+        postgresql_include=['hostname', 'port'],
+    )
+    op.create_index(
+        'ix_call_socket_started', 'call', ['socket_id', sa.text('started DESC')]
+    )
+    op.create_index('ix_plug_proc_type', 'plug', ['processor_id', 'type'])
+    op.create_index('ix_event_call_id', 'event', ['call_id'])
+    op.create_index('ix_deployment_proc', 'deployment', ['processor_id'])
+
+
+def downgrade():
+    op.drop_index('ix_deployment_proc', table_name='deployment')
+    op.drop_index('ix_event_call_id', table_name='event')
+    op.drop_index('ix_plug_proc_type', table_name='plug')
+    op.drop_index('ix_call_socket_started', table_name='call')
+    op.drop_index('ix_worker_proc_status', table_name='worker')
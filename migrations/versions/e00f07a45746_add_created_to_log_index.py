@@ -0,0 +1,30 @@
+"""add created desc to the log index
+
+Revision ID: e00f07a45746
+Revises: 2d01737671af
+Create Date: 2026-10-15 09:49:36.207415
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e00f07a45746'
+down_revision = '2d01737671af'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        'ix_log_oid_disc_created_desc',
+        'log',
+        ['oid', 'discriminator', sa.text('created DESC')],
+    )
+    op.drop_index('ix_log_oid_disc', table_name='log')
+
+
+def downgrade():
+    op.create_index('ix_log_oid_disc', 'log', ['oid', 'discriminator'])
+    op.drop_index('ix_log_oid_disc_created_desc', table_name='log')
@@ -0,0 +1,124 @@
+"""store status and type tokens as smallint codes
+
+Revision ID: e2b2053b8219
+Revises: 1ad4356ca480
+Create Date: 2026-10-15 10:52:37.604118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2b2053b8219'
+down_revision = '1ad4356ca480'
+branch_labels = None
+depends_on = None
+
+STATUS_TABLES = (
+    'action', 'agent', 'argument', 'call', 'container', 'deployment', 'event',
+    'file', 'flow', 'gate', 'network', 'node', 'passwords', 'plug', 'privilege',
+    'processor', 'queue', 'role', 'scheduler', 'settings', 'socket', 'task',
+    'users', 'work', 'worker',
+)
+
+# Frozen copy of the Token enums as of this revision. A token's code is its
+# position in the tuple
+STATUS = (
+    'ready', 'running', 'stopped', 'paused', 'resumed', 'removed', 'down',
+    'pending', 'error', 'create', 'update', 'updating', 'start',
+    'starting', 'started', 'stop', 'restart', 'kill', 'killed', 'move',
+)
+ACTION_TARGET = ('host', 'worker', 'processor', 'queue', 'all')
+QUEUE_TYPE = ('direct', 'topic', 'fanout')
+SERIALIZER = ('json', 'pickle', 'yaml', 'msgpack')
+CALL_STATE = ('received', 'prerun', 'postrun', 'finished')
+
+# (table, column, tokens, varchar length it is restored to on downgrade)
+TOKEN_COLUMNS = (
+    *((table, 'status', STATUS, 20) for table in STATUS_TABLES),
+    *((table, 'requested_status', STATUS, 40) for table in STATUS_TABLES),
+    ('action', 'target', ACTION_TARGET, 20),
+    ('queue', 'qtype', QUEUE_TYPE, 20),
+    ('processor', 'serializer', SERIALIZER, 10),
+    ('call', 'state', CALL_STATE, 10),
+)
+
+
+# processor_stats reads worker.status, so it is rebuilt around the type
+# change. {running} is the RUNNING token in the column's current form
+PROCESSOR_STATS_SQL = """
+SELECT p.id,
+       COALESCE(pl.n, 0) AS plug_count,
+       COALESCE(s.n, 0) AS socket_count,
+       COALESCE(d.n, 0) AS deployment_count,
+       COALESCE(w.n, 0) AS running_workers
+FROM processor p
+LEFT JOIN (SELECT processor_id, COUNT(*) AS n FROM plug GROUP BY processor_id) pl
+       ON pl.processor_id = p.id
+LEFT JOIN (SELECT processor_id, COUNT(*) AS n FROM socket GROUP BY processor_id) s
+       ON s.processor_id = p.id
+LEFT JOIN (SELECT processor_id, COUNT(*) AS n FROM deployment GROUP BY processor_id) d
+       ON d.processor_id = p.id
+LEFT JOIN (SELECT processor_id, COUNT(*) AS n FROM worker
+           WHERE status = {running} GROUP BY processor_id) w
+       ON w.processor_id = p.id
+"""
+
+
+def _drop_processor_stats():
+    op.execute('DROP MATERIALIZED VIEW IF EXISTS processor_stats')
+
+
+def _create_processor_stats(running):
+    op.execute(
+        'CREATE MATERIALIZED VIEW processor_stats AS '
+        + PROCESSOR_STATS_SQL.format(running=running)
+    )
+    op.execute(
+        'CREATE UNIQUE INDEX ix_processor_stats_id ON processor_stats (id)'
+    )
+
+
+def _case(column, pairs):
+    whens = ' '.join(f'WHEN {old} THEN {new}' for old, new in pairs)
+    return f'CASE {column} {whens} ELSE NULL END'
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    _drop_processor_stats()
+
+    for table, column, tokens, _ in TOKEN_COLUMNS:
+        current = {c['name']: c['type'] for c in inspector.get_columns(table)}
+        # Databases built by create_all after the model change are already
+        # smallint
+        if isinstance(current[column], sa.SmallInteger):
+            continue
+
+        # Unknown tokens become NULL, so a NOT NULL column holding one fails
+        # the migration rather than silently picking a status
+        pairs = [(f"'{token}'", code) for code, token in enumerate(tokens)]
+        op.alter_column(
+            table,
+            column,
+            type_=sa.SmallInteger(),
+            postgresql_using=_case(f'lower({column})', pairs),
+        )
+
+    _create_processor_stats(STATUS.index('running'))
+
+
+def downgrade():
+    _drop_processor_stats()
+
+    for table, column, tokens, length in TOKEN_COLUMNS:
+        pairs = [(code, f"'{token}'") for code, token in enumerate(tokens)]
+        op.alter_column(
+            table,
+            column,
+            type_=sa.String(length),
+            postgresql_using=_case(column, pairs),
+        )
+
+    _create_processor_stats("'running'")
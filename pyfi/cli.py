@@ -39,6 +39,7 @@ if "NEW_RELIC_CONFIG_FILE" in os.environ:
     newrelic.agent.initialize(os.environ["NEW_RELIC_CONFIG_FILE"])
 
 from pyfi.db.model import (
+    QUERY_CACHE_SIZE,
     AgentModel,
     ArgumentModel,
     CallModel,
@@ -59,9 +60,10 @@ from pyfi.db.model import (
     TaskModel,
     UserModel,
     WorkerModel,
+    init_oso,
     oso,
 )
-from pyfi.db.model.models import PrivilegeModel
+from pyfi.db.model.models import PrivilegeModel, Right
 from pyfi.web import run_http
 
 HOSTNAME = platform.node()
@@ -223,7 +225,9 @@ def cli(context, debug, db, backend, broker, api, user, password, ini, config):
     context.obj["dburi"] = db
 
     try:
-        engine = create_engine(db, isolation_level="READ UNCOMMITTED")
+        engine = create_engine(
+            db, isolation_level="READ UNCOMMITTED", query_cache_size=QUERY_CACHE_SIZE
+        )
         engine.uri = db
         session = sessionmaker(bind=engine)()
 
@@ -283,6 +287,7 @@ def cli(context, debug, db, backend, broker, api, user, password, ini, config):
         context.obj["database"].session.close()
 
         """ RBAC """
+        init_oso()
         oso.load_files([home + "/pyfi.polar"])
 
         def get_checked_permissions(*args, **kwargs):
@@ -317,9 +322,8 @@ def cli(context, debug, db, backend, broker, api, user, password, ini, config):
                 NetworkModel: "read",
             }
 
-            for privilege in _user.privileges:
-                if privilege.right == "READ_LOG":
-                    permissions[LogModel] = "read"
+            if _user.has_right(Right.READ_LOG):
+                permissions[LogModel] = "read"
 
             session.close()
 
@@ -362,7 +366,9 @@ def cli(context, debug, db, backend, broker, api, user, password, ini, config):
                     # Publish to redis, pubsub, which gets sent to browser
                     redisclient.publish(
                         "global",
-                        json.dumps({"type": "processor", "processor": str(obj)}),
+                        json.dumps(
+                            {"type": "processor", "processor": obj.to_json().decode()}
+                        ),
                     )
 
         # Generate OSO user policy file based on roles and privileges in the database
@@ -1464,7 +1470,7 @@ def add_node_to_scheduler(context, node):
     context.obj["database"].session.add(scheduler)
     context.obj["database"].session.commit()
 
-    print(_node)
+    print(_node.to_json().decode())
 
 
 @cli.group()
@@ -1997,7 +2003,7 @@ def add_task(context, name, module, code, repo):
     task.updated = datetime.now()
     context.obj["database"].session.commit()
 
-    print(task)
+    print(task.to_json().decode())
 
 
 @add.command(name="deployment")
@@ -2249,7 +2255,7 @@ def add_processor(
     context.obj["database"].session.add(processor)
     context.obj["database"].session.commit()
 
-    print(processor)
+    print(processor.to_json().decode())
 
 
 @add.command(name="network")
@@ -2380,7 +2386,7 @@ def add_scheduler(context, name, strategy):
     context.obj["database"].session.add(scheduler)
     context.obj["database"].session.commit()
 
-    print(scheduler)
+    print(scheduler.to_json().decode())
 
 
 @add.command(name="node")
@@ -2398,7 +2404,7 @@ def add_node(context, name, hostname):
     context.obj["database"].session.add(node)
     context.obj["database"].session.commit()
 
-    print(node)
+    print(node.to_json().decode())
 
 
 @add.command(name="agent")
@@ -2417,7 +2423,7 @@ def add_agent(context, name, node):
     context.obj["database"].session.add(agent)
     context.obj["database"].session.commit()
 
-    print(agent)
+    print(agent.to_json().decode())
 
 
 @add.command(name="role")
@@ -2434,7 +2440,7 @@ def add_role(context, name):
     context.obj["database"].session.add(role)
     context.obj["database"].session.commit()
 
-    print(role)
+    print(role.to_json().decode())
 
 
 @add.command(name="queue")
@@ -2462,7 +2468,7 @@ def add_queue(context, name, type):
     context.obj["database"].session.add(queue)
     context.obj["database"].session.commit()
 
-    print(queue)
+    print(queue.to_json().decode())
 
 
 @update.command(name="task")
@@ -2497,7 +2503,7 @@ def update_task(context, name, module, code):
         )
         socket.processor.requested_status = "update"
 
-        print(socket)
+        print(socket.to_json().decode())
 
     context.obj["database"].session.add(_task)
     context.obj["database"].session.commit()
@@ -2618,7 +2624,7 @@ def update_plug(context, name, queue, procid, procname):
     context.obj["database"].session.add(plug)
     context.obj["database"].session.add(current_processor)
     context.obj["database"].session.commit()
-    print(plug)
+    print(plug.to_json().decode())
 
 
 @add.command(name="plug")
@@ -2672,7 +2678,7 @@ def add_plug(context, name, queue, source, target):
     context.obj["database"].session.add(plug)
     context.obj["database"].session.commit()
 
-    print(plug)
+    print(plug.to_json().decode())
 
 
 @add.command(name="socket")
@@ -2743,7 +2749,7 @@ def add_socket(context, name, queue, interval, procname, task):
     context.obj["database"].session.add(socket)
     context.obj["database"].session.add(processor)
     context.obj["database"].session.commit()
-    print(socket)
+    print(socket.to_json().decode())
 
 
 @cli.group()
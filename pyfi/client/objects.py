@@ -21,6 +21,7 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
 from pyfi.db.model import (
+    QUERY_CACHE_SIZE,
     AgentModel,
     ArgumentModel,
     DeploymentModel,
@@ -72,7 +73,7 @@ class Base:
     db = CONFIG.get("database", "uri")
     backend = CONFIG.get("backend", "uri")
     broker = CONFIG.get("broker", "uri")
-    database = create_engine(db)
+    database = create_engine(db, query_cache_size=QUERY_CACHE_SIZE)
     session = sessionmaker(bind=database)()
     setattr(database, "session", session)
 
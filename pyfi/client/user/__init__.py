@@ -5,11 +5,11 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
 from pyfi.config import CONFIG
-from pyfi.db.model import UserModel
+from pyfi.db.model import QUERY_CACHE_SIZE, UserModel
 
 db = CONFIG.get("database", "uri")
 
-engine = create_engine(db)
+engine = create_engine(db, query_cache_size=QUERY_CACHE_SIZE)
 setattr(engine, "uri", db)
 session = sessionmaker(bind=engine)()
 setattr(engine, "session", session)
@@ -3,10 +3,12 @@
 import configparser
 import logging
 from contextlib import contextmanager
+from functools import lru_cache
 from pathlib import Path
 
 from sqlalchemy import create_engine, event
 
+from .model.models import QUERY_CACHE_SIZE
 from .model.models import ActionModel as Action
 from .model.models import AgentModel
 from .model.models import AgentModel as Agent
@@ -70,7 +72,7 @@ def receive_before_update(mapper, connection, target):
                 {
                     "type": target.__class__.__name__,
                     "name": target.name,
-                    "object": json.loads(str(target)),
+                    "object": json.loads(target.to_json()),
                 }
             ),
         )
@@ -78,13 +80,25 @@ def receive_before_update(mapper, connection, target):
         logging.debug("No changes!")
 
 
+@lru_cache(maxsize=32)
+def _get_engine(uri):
+    """One shared engine per URI so its compiled statement cache outlives each session"""
+    from sqlalchemy.pool import NullPool
+
+    return create_engine(
+        uri,
+        isolation_level="AUTOCOMMIT",
+        poolclass=NullPool,
+        query_cache_size=QUERY_CACHE_SIZE,
+    )
+
+
 @contextmanager
 def get_session(**kwargs):
     # from pymongo import MongoClient
     logging.debug("get_session: Creating session")
 
     from sqlalchemy.orm import scoped_session, sessionmaker
-    from sqlalchemy.pool import NullPool
 
     user = kwargs["user"] if "user" in kwargs else None
     uri = CONFIG.get("database", "uri")
@@ -116,7 +130,7 @@ def get_session(**kwargs):
         )
         logging.info("DB URI FOR USER: %s", uri)
 
-    _engine = create_engine(uri, isolation_level="AUTOCOMMIT", poolclass=NullPool)
+    _engine = _get_engine(uri)
     conn = _engine.connect()
     session = scoped_session(sessionmaker(bind=_engine))
 
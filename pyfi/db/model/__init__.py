@@ -1,6 +1,8 @@
 # type: ignore
 
 from .models import (
+    DEFAULT_LOAD_OPTS,
+    QUERY_CACHE_SIZE,
     ActionModel,
     AgentModel,
     AlchemyEncoder,
@@ -19,6 +21,7 @@ from .models import (
     PasswordModel,
     PlugModel,
     ProcessorModel,
+    ProcessorStatsModel,
     QueueModel,
     RoleModel,
     SchedulerModel,
@@ -29,12 +32,21 @@ from .models import (
     VersionModel,
     WorkerModel,
     WorkModel,
+    alchemy_default,
+    init_oso,
     oso,
+    refresh_processor_stats,
+    with_rels,
 )
 
 __all__ = (
     "oso",
+    "init_oso",
     "AlchemyEncoder",
+    "alchemy_default",
+    "DEFAULT_LOAD_OPTS",
+    "QUERY_CACHE_SIZE",
+    "with_rels",
     "WorkerModel",
     "VersionModel",
     "ArgumentModel",
@@ -44,6 +56,8 @@ __all__ = (
     "AgentModel",
     "RoleModel",
     "ProcessorModel",
+    "ProcessorStatsModel",
+    "refresh_processor_stats",
     "UserModel",
     "QueueModel",
     "WorkModel",
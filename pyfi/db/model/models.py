@@ -2,12 +2,19 @@
 
 """
 Class database model definitions
+
+Engines bound to these models should be created with
+``create_engine(uri, query_cache_size=QUERY_CACHE_SIZE)`` and reused, so
+the statements emitted for the secondary and primaryjoin relationships
+below are compiled once and served from the engine's statement cache.
 """
 
+import enum
 import json
 from datetime import datetime
 from typing import Any, Optional
 
+import orjson
 from oso import Oso
 from sqlalchemy import (
     Boolean,
@@ -16,24 +23,76 @@ from sqlalchemy import (
     Enum,
     Float,
     ForeignKey,
+    Index,
     Integer,
     LargeBinary,
+    MetaData,
+    SmallInteger,
     String,
     Table,
     Text,
     and_,
+    cast,
+    event,
+    func,
+    inspect,
+    literal,
     literal_column,
+    text,
 )
-from sqlalchemy.dialects.postgresql import DOUBLE_PRECISION
+from sqlalchemy.dialects.postgresql import BIT, DOUBLE_PRECISION, UUID
 from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.ext.declarative import DeclarativeMeta, declared_attr
-from sqlalchemy.orm import declarative_base, foreign, relationship
-from sqlalchemy.schema import CreateColumn
+from sqlalchemy.orm import (
+    Mapper,
+    declarative_base,
+    deferred,
+    foreign,
+    raiseload,
+    relationship,
+    selectinload,
+)
+from sqlalchemy.schema import DDL, CreateColumn
+from sqlalchemy.types import TypeDecorator
 
 Base: Any = declarative_base(name="Base")
 
+# Compiled statement cache entries per engine (SQLAlchemy defaults to 500)
+QUERY_CACHE_SIZE = 1200
+
+# Ids and the foreign keys that reference them are stored as native 16 byte
+# uuids but stay plain strings on the Python side
+UUIDString = UUID(as_uuid=False)
+
 oso = Oso()
 
+# Model classes exposed to oso policies, registered by init_oso()
+_OSO_REGISTRY = []
+_oso_initialized = False
+
+
+def _osoclass(cls):
+    _OSO_REGISTRY.append(cls)
+    return cls
+
+
+def _register_all(*classes):
+    # oso has no batch registration API, so this is the single place that
+    # feeds it classes, once per process
+    for cls in dict.fromkeys(classes):
+        oso.register_class(cls)
+
+
+def init_oso():
+    """Register the model classes with oso. Call before loading any policy"""
+    global _oso_initialized
+
+    if _oso_initialized:
+        return
+
+    _register_all(*_OSO_REGISTRY)
+    _oso_initialized = True
+
 
 @compiles(CreateColumn, "postgresql")
 def use_identity(element, compiler, **kw):
@@ -42,29 +101,216 @@ def use_identity(element, compiler, **kw):
     return text
 
 
+@event.listens_for(Mapper, "mapper_configured")
+def _set_json_columns(mapper, cls):
+    # The serializable column set is static per class, so compute it once
+    cls.__json_columns__ = tuple(attr.key for attr in mapper.column_attrs)
+
+
+def _coerce(data):
+    if isinstance(data, datetime):
+        return data.isoformat()
+
+    if isinstance(data, Right):
+        # masks can be wider than the 64 bit ints json encoders accept
+        return tuple(right.name for right in Right if right in data)
+
+    if isinstance(data, bytes):
+        # binary blobs are not json-encodable
+        return None
+
+    return data
+
+
+def _load_columns(obj):
+    """Load the expired and deferred columns of a persistent instance
+
+    Relationships are left alone, so this never fires a lazy load
+    """
+    insp = inspect(obj)
+    if not insp.persistent:
+        return
+
+    columns = insp.mapper.column_attrs
+    unloaded = [key for key in insp.unloaded if key in columns]
+    # Touching a non-deferred column first reloads every expired one in a
+    # single SELECT, then each deferred group loads in one more
+    for key in sorted(unloaded, key=lambda key: columns[key].deferred):
+        getattr(obj, key)
+
+
+def _identity_id(obj):
+    """The id of an instance, from its identity key once it has one"""
+    identity = inspect(obj).identity
+    return identity[0] if identity else obj.__dict__.get("id")
+
+
+def _model_to_dict(obj):
+    """Build a json-encodable dict of the loaded columns on a model instance"""
+    # Only reads loaded state; callers reload columns with _load_columns
+    state = obj.__dict__
+    return {key: _coerce(state[key]) for key in obj.__json_columns__ if key in state}
+
+
+def alchemy_default(obj):
+    """orjson default hook that serializes SQLAlchemy model instances"""
+    if isinstance(obj.__class__, DeclarativeMeta):
+        # an SQLAlchemy class
+        _load_columns(obj)
+        return _model_to_dict(obj)
+
+    raise TypeError
+
+
 class AlchemyEncoder(json.JSONEncoder):
+    """Compatibility shim for callers that still pass cls=AlchemyEncoder"""
+
     def default(self, obj):
-        from datetime import datetime
-
-        if isinstance(obj.__class__, DeclarativeMeta):
-            # an SQLAlchemy class
-            fields = {}
-            for field in [
-                x for x in dir(obj) if not x.startswith("_") and x != "metadata"
-            ]:
-                data = obj.__getattribute__(field)
-                try:
-                    # this will fail on non-encodable values, like other classes
-                    if type(data) is datetime:
-                        data = str(data)
-                    json.dumps(data)
-                    fields[field] = data
-                except TypeError:
-                    fields[field] = None
-            # a json-encodable dict
-            return fields
-
-        return json.JSONEncoder.default(self, obj)
+        try:
+            return alchemy_default(obj)
+        except TypeError:
+            return json.JSONEncoder.default(self, obj)
+
+
+# Query options that refuse to lazy load any relationship. Pass these (or
+# with_rels) to Query.options() so serializing a result can never fan out
+# into N+1 selects.
+DEFAULT_LOAD_OPTS = (raiseload("*"),)
+
+
+def with_rels(*paths):
+    """Query options that selectin-load the given relationships and raise on any other"""
+    return (*[selectinload(path) for path in paths], *DEFAULT_LOAD_OPTS)
+
+
+class Token(str, enum.Enum):
+    """String enum whose members compare equal to, and format as, their token
+
+    Members are declared as ``NAME = token, code``. The code is what gets
+    stored, so it must never change once assigned
+    """
+
+    def __new__(cls, token, code):
+        member = str.__new__(cls, token)
+        member._value_ = token
+        member.code = code
+        return member
+
+    def __str__(self):
+        return self.value
+
+
+class Status(Token):
+    READY = "ready", 0
+    RUNNING = "running", 1
+    STOPPED = "stopped", 2
+    PAUSED = "paused", 3
+    RESUMED = "resumed", 4
+    REMOVED = "removed", 5
+    DOWN = "down", 6
+    PENDING = "pending", 7
+    ERROR = "error", 8
+    CREATE = "create", 9
+    UPDATE = "update", 10
+    UPDATING = "updating", 11
+    START = "start", 12
+    STARTING = "starting", 13
+    STARTED = "started", 14
+    STOP = "stop", 15
+    RESTART = "restart", 16
+    KILL = "kill", 17
+    KILLED = "killed", 18
+    MOVE = "move", 19
+
+
+class CallState(Token):
+    RECEIVED = "received", 0
+    PRERUN = "prerun", 1
+    POSTRUN = "postrun", 2
+    FINISHED = "finished", 3
+
+
+class QueueType(Token):
+    DIRECT = "direct", 0
+    TOPIC = "topic", 1
+    FANOUT = "fanout", 2
+
+
+class Serializer(Token):
+    JSON = "json", 0
+    PICKLE = "pickle", 1
+    YAML = "yaml", 2
+    MSGPACK = "msgpack", 3
+
+
+class ActionTarget(Token):
+    HOST = "host", 0
+    WORKER = "worker", 1
+    PROCESSOR = "processor", 2
+    QUEUE = "queue", 3
+    ALL = "all", 4
+
+
+class SmallCode(TypeDecorator):
+    """Stores a Token enum as its SMALLINT code, loading it back as the member"""
+
+    impl = SmallInteger
+    cache_ok = True
+
+    def __init__(self, enum):
+        super().__init__()
+        self.enum = enum
+        self._by_code = {member.code: member for member in enum}
+
+        if len(self._by_code) != len(enum):
+            raise ValueError(f"{enum.__name__} reuses a code")
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+
+        return self.enum(value).code
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+
+        return self._by_code[value]
+
+
+class MsgpackZstd(TypeDecorator):
+    """Stores a value as zstd-compressed msgpack, still reading legacy pickled rows"""
+
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        import msgpack
+        import zstandard
+
+        if value is None:
+            return None
+
+        return zstandard.ZstdCompressor().compress(
+            msgpack.packb(value, use_bin_type=True)
+        )
+
+    def process_result_value(self, value, dialect):
+        import msgpack
+        import zstandard
+
+        if value is None:
+            return None
+
+        # Pickle protocol 2+ streams start with the PROTO opcode
+        if value[:1] == b"\x80":
+            import pickle
+
+            return pickle.loads(value)
+
+        return msgpack.unpackb(
+            zstandard.ZstdDecompressor().decompress(value), raw=False
+        )
 
 
 class HasLogins(object):
@@ -92,66 +338,86 @@ class HasLogs(object):
         )
 
 
-class BaseModel(Base):
-    """
-    Docstring
-    """
-
-    __abstract__ = True
-
+class IdMixin(object):
     id = Column(
-        String(40),
+        UUIDString,
         autoincrement=False,
         default=literal_column("uuid_generate_v4()"),
-        unique=True,
         primary_key=True,
     )
-    name = Column(String(80), unique=True, nullable=False, primary_key=True)
-    owner = Column(String(40), default=literal_column("current_user"))
 
-    status = Column(String(20), nullable=False, default="ready")
-    requested_status = Column(String(40), default="ready")
+    def __repr__(self):
+        # Reads the identity key only, so logging a model never emits SQL
+        return f"<{type(self).__name__} id={_identity_id(self)}>"
 
-    enabled = Column(Boolean)
-    created = Column(DateTime, default=datetime.now, nullable=False)
+    def to_json(self) -> bytes:
+        _load_columns(self)
+        return orjson.dumps(_model_to_dict(self))
+
+
+class AuditMixin(object):
+    owner = Column(String(40), default=literal_column("current_user"))
+    created = Column(DateTime, server_default=func.now(), nullable=False)
     lastupdated = Column(
-        DateTime, default=datetime.now, onupdate=datetime.now, nullable=False
+        DateTime, server_default=func.now(), onupdate=func.now(), nullable=False
     )
 
+
+class NamedMixin(object):
+    name = Column(String(80), unique=True, nullable=False)
+
+    status = Column(SmallCode(Status), nullable=False, default=Status.READY)
+    requested_status = Column(SmallCode(Status), default=Status.READY)
+
+    enabled = Column(Boolean)
+
     def __repr__(self):
-        return json.dumps(self, cls=AlchemyEncoder)
+        name = self.__dict__.get("name")
+        return f"<{type(self).__name__} id={_identity_id(self)} name={name}>"
 
 
-class LogModel(Base):
+@_osoclass
+class BaseModel(NamedMixin, IdMixin, AuditMixin, Base):
     """
     Docstring
     """
 
-    __tablename__ = "log"
+    __abstract__ = True
 
-    id = Column(
-        String(40),
-        autoincrement=False,
-        default=literal_column("uuid_generate_v4()"),
-        unique=True,
-        primary_key=True,
-    )
 
-    user_id = Column(String, ForeignKey("users.id"), nullable=False)
+@_osoclass
+class LogModel(IdMixin, Base):
+    """
+    Docstring
+    """
+
+    __tablename__ = "log"
+
+    user_id = Column(UUIDString, ForeignKey("users.id"), nullable=False)
     user = relationship("UserModel", lazy=True, cascade="all")
 
     public = Column(Boolean, default=False)
-    created = Column(DateTime, default=datetime.now, nullable=False)
-    oid = Column(String(40), primary_key=True)
+    created = Column(DateTime, server_default=func.now(), nullable=False)
+    oid = Column(UUIDString, nullable=False)
     discriminator = Column(String(40))
     text = Column(String(80), nullable=False)
     source = Column(String(40), nullable=False)
 
     def __repr__(self):
-        return json.dumps(self, cls=AlchemyEncoder)
+        oid = self.__dict__.get("oid")
+        return f"<{type(self).__name__} id={_identity_id(self)} oid={oid}>"
+
+
+# Backs HasLogs.logs, which joins on (oid, discriminator) and sorts by created desc
+Index(
+    "ix_log_oid_disc_created_desc",
+    LogModel.oid,
+    LogModel.discriminator,
+    LogModel.created.desc(),
+)
 
 
-rights = [
+rights = (
     "ALL",
     "CREATE",
     "READ",
@@ -172,7 +438,8 @@ rights = [
     "VIEW_PROCESSOR_CONFIG",
     "VIEW_PROCESSOR_CODE",
     "EDIT_PROCESSOR_CONFIG",
-    "EDIT_PROCESSOR_CODE" "LS_PROCESSORS",
+    "EDIT_PROCESSOR_CODE",
+    "LS_PROCESSORS",
     "LS_USERS",
     "LS_USER",
     "LS_PLUGS",
@@ -221,9 +488,118 @@ rights = [
     "READ_SCHEDULER",
     "READ_SOCKET",
     "READ_USER",
-]
+)
 
 
+class Right(enum.IntFlag):
+    """Bitmask form of rights, so access checks are bitwise ops rather than privilege joins"""
+
+    ALL = 1 << 0
+    CREATE = 1 << 1
+    READ = 1 << 2
+    UPDATE = 1 << 3
+    DELETE = 1 << 4
+    DB_DROP = 1 << 5
+    DB_INIT = 1 << 6
+    START_AGENT = 1 << 7
+    RUN_TASK = 1 << 8
+    CANCEL_TASK = 1 << 9
+    START_PROCESSOR = 1 << 10
+    STOP_PROCESSOR = 1 << 11
+    PAUSE_PROCESSOR = 1 << 12
+    RESUME_PROCESSOR = 1 << 13
+    LOCK_PROCESSOR = 1 << 14
+    UNLOCK_PROCESSOR = 1 << 15
+    VIEW_PROCESSOR = 1 << 16
+    VIEW_PROCESSOR_CONFIG = 1 << 17
+    VIEW_PROCESSOR_CODE = 1 << 18
+    EDIT_PROCESSOR_CONFIG = 1 << 19
+    EDIT_PROCESSOR_CODE = 1 << 20
+    LS_PROCESSORS = 1 << 21
+    LS_USERS = 1 << 22
+    LS_USER = 1 << 23
+    LS_PLUGS = 1 << 24
+    LS_SOCKETS = 1 << 25
+    LS_QUEUES = 1 << 26
+    LS_AGENTS = 1 << 27
+    LS_NODES = 1 << 28
+    LS_SCHEDULERS = 1 << 29
+    LS_WORKERS = 1 << 30
+    ADD_PROCESSOR = 1 << 31
+    ADD_AGENT = 1 << 32
+    ADD_NODE = 1 << 33
+    ADD_PLUG = 1 << 34
+    ADD_PRIVILEGE = 1 << 35
+    ADD_QUEUE = 1 << 36
+    ADD_ROLE = 1 << 37
+    ADD_SCHEDULER = 1 << 38
+    ADD_SOCKET = 1 << 39
+    ADD_USER = 1 << 40
+    UPDATE_PROCESSOR = 1 << 41
+    UPDATE_AGENT = 1 << 42
+    UPDATE_NODE = 1 << 43
+    UPDATE_PLUG = 1 << 44
+    UPDATE_ROLE = 1 << 45
+    UPDATE_SCHEDULER = 1 << 46
+    UPDATE_SOCKET = 1 << 47
+    UPDATE_USER = 1 << 48
+    DELETE_PROCESSOR = 1 << 49
+    DELETE_AGENT = 1 << 50
+    DELETE_NODE = 1 << 51
+    DELETE_PLUG = 1 << 52
+    DELETE_PRIVILEGE = 1 << 53
+    DELETE_QUEUE = 1 << 54
+    DELETE_ROLE = 1 << 55
+    DELETE_SCHEDULER = 1 << 56
+    DELETE_SOCKET = 1 << 57
+    DELETE_USER = 1 << 58
+    READ_PROCESSOR = 1 << 59
+    READ_AGENT = 1 << 60
+    READ_NODE = 1 << 61
+    READ_LOG = 1 << 62
+    READ_PLUG = 1 << 63
+    READ_PRIVILEGE = 1 << 64
+    READ_QUEUE = 1 << 65
+    READ_ROLE = 1 << 66
+    READ_SCHEDULER = 1 << 67
+    READ_SOCKET = 1 << 68
+    READ_USER = 1 << 69
+
+
+# The PG "right" enum and the bitmask must name the same rights; catch a
+# dropped comma or a rename in one place only at import rather than at DDL time
+if set(rights) != set(Right.__members__) or len(rights) != len(set(rights)):
+    raise ValueError("rights labels and Right members are out of sync")
+
+# Stored mask width. Right has more members than fit in a BIGINT, so masks are
+# kept as a bit string with headroom for new rights
+RIGHTS_WIDTH = 128
+
+
+class RightsType(TypeDecorator):
+    """Stores a Right mask in a fixed-width PostgreSQL bit string"""
+
+    impl = BIT(RIGHTS_WIDTH)
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+
+        return format(int(value), f"0{RIGHTS_WIDTH}b")
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+
+        return Right(int(value, 2))
+
+
+# All-zero mask, so the rights columns can be added to populated tables
+NO_RIGHTS = cast(literal(0), BIT(RIGHTS_WIDTH))
+
+
+@_osoclass
 class PrivilegeModel(BaseModel):
     """
     Docstring
@@ -242,6 +618,7 @@ role_privileges = Table(
 )
 
 
+@_osoclass
 class RoleModel(BaseModel):
     """
     Docstring
@@ -250,7 +627,11 @@ class RoleModel(BaseModel):
     __tablename__ = "role"
 
     privileges = relationship(
-        "PrivilegeModel", secondary=role_privileges, lazy="subquery"
+        "PrivilegeModel", secondary=role_privileges, lazy="selectin"
+    )
+
+    rights = Column(
+        RightsType, nullable=False, default=Right(0), server_default=NO_RIGHTS
     )
 
 
@@ -276,6 +657,7 @@ user_roles = Table(
 )
 
 
+@_osoclass
 class UserModel(HasLogins, BaseModel):
     """
     Docstring
@@ -287,14 +669,65 @@ class UserModel(HasLogins, BaseModel):
     clear = Column(String(60), unique=False, nullable=False)
 
     privileges = relationship(
-        "PrivilegeModel", secondary=user_privileges, lazy="subquery"
+        "PrivilegeModel", secondary=user_privileges, lazy="selectin"
     )
 
     revoked = relationship(
-        "PrivilegeModel", secondary=user_privileges_revoked, lazy="subquery"
+        "PrivilegeModel", secondary=user_privileges_revoked, lazy="selectin"
+    )
+
+    roles = relationship("RoleModel", secondary=user_roles, lazy="selectin")
+
+    rights_granted = Column(
+        RightsType, nullable=False, default=Right(0), server_default=NO_RIGHTS
+    )
+    rights_revoked = Column(
+        RightsType, nullable=False, default=Right(0), server_default=NO_RIGHTS
     )
 
-    roles = relationship("RoleModel", secondary=user_roles, lazy="subquery")
+    @property
+    def rights(self):
+        """Rights granted to this user or any of its roles, less those revoked"""
+        granted = Right(self.rights_granted or 0)
+        for role in self.roles:
+            granted |= role.rights or 0
+
+        return granted & ~Right(self.rights_revoked or 0)
+
+    def has_right(self, right):
+        return bool(self.rights & right)
+
+
+def _privilege_mask(privileges):
+    mask = Right(0)
+    for privilege in privileges:
+        mask |= Right.__members__.get(privilege.right, Right(0))
+
+    return mask
+
+
+def _sync_rights(collection, column):
+    """Keep a Right mask column in step with its privilege collection"""
+
+    @event.listens_for(collection, "append")
+    def append(target, value, initiator):
+        mask = Right(getattr(target, column) or 0)
+        setattr(target, column, mask | _privilege_mask([value]))
+
+    @event.listens_for(collection, "remove")
+    def remove(target, value, initiator):
+        # Fires before the item leaves the collection, or after a bulk replace
+        # already swapped it out. Drop just this one instance, as the same
+        # privilege may be held more than once
+        remaining = list(getattr(target, collection.key))
+        if value in remaining:
+            remaining.remove(value)
+        setattr(target, column, _privilege_mask(remaining))
+
+
+_sync_rights(RoleModel.privileges, "rights")
+_sync_rights(UserModel.privileges, "rights_granted")
+_sync_rights(UserModel.revoked, "rights_revoked")
 
 
 socket_types = ["RESULT", "ERROR"]
@@ -306,6 +739,7 @@ schedule_types = ["CRON", "INTERVAL"]
 strategies = ["BALANCED", "EFFICIENT"]
 
 
+@_osoclass
 class FileModel(BaseModel):
 
     __tablename__ = "file"
@@ -313,13 +747,13 @@ class FileModel(BaseModel):
     path = Column(String(120))
     filename = Column(String(80))
     collection = Column(String(80))
-    code = Column(Text)
+    code = deferred(Column(Text), group="payload")
     type = Column(String(40))
     icon = Column(String(40))
     versions = relationship(
         "VersionModel", back_populates="file", cascade="all, delete-orphan"
     )
-    user_id = Column(String, ForeignKey("users.id"), nullable=False)
+    user_id = Column(UUIDString, ForeignKey("users.id"), nullable=False)
     user = relationship("UserModel", lazy=True, cascade="all")
 
 
@@ -331,6 +765,7 @@ flows_versions = Table(
 )
 
 
+@_osoclass
 class FlowModel(BaseModel):
     """
     A flow model
@@ -343,7 +778,7 @@ class FlowModel(BaseModel):
     processors = relationship("ProcessorModel", lazy=True)
 
     # File reference for this flow. i.e. it's saved state
-    file_id = Column(String, ForeignKey("file.id"), nullable=False)
+    file_id = Column(UUIDString, ForeignKey("file.id"), nullable=False)
     file = relationship(
         "FileModel", lazy=True, cascade="all, delete-orphan", single_parent=True
     )
@@ -352,6 +787,7 @@ class FlowModel(BaseModel):
     versions = relationship("VersionModel", secondary=flows_versions, lazy=True)
 
 
+@_osoclass
 class AgentModel(BaseModel):
     """
     Docstring
@@ -367,9 +803,10 @@ class AgentModel(BaseModel):
         "WorkerModel", backref="agent", lazy=True, cascade="all, delete-orphan"
     )
 
-    node_id = Column(String(40), ForeignKey("node.id"), nullable=False)
+    node_id = Column(UUIDString, ForeignKey("node.id"), nullable=False)
 
 
+@_osoclass
 class ActionModel(BaseModel):
     """
     Docstring
@@ -379,9 +816,10 @@ class ActionModel(BaseModel):
     params = Column(String(80))
 
     # host, worker, processor, queue, or all
-    target = Column(String(20), nullable=False)
+    target = Column(SmallCode(ActionTarget), nullable=False)
 
 
+@_osoclass
 class WorkerModel(BaseModel):
     """
     Docstring
@@ -399,60 +837,68 @@ class WorkerModel(BaseModel):
 
     processor = relationship("ProcessorModel")
     processor_id = Column(
-        String(40), ForeignKey("processor.id", ondelete="CASCADE"), nullable=False
+        UUIDString, ForeignKey("processor.id", ondelete="CASCADE"), nullable=False
     )
 
-    deployment_id = Column(String(40), ForeignKey("deployment.id"), nullable=True)
+    deployment_id = Column(UUIDString, ForeignKey("deployment.id"), nullable=True)
 
     deployment = relationship("DeploymentModel", back_populates="worker")
 
-    agent_id = Column(String(40), ForeignKey("agent.id"), nullable=False)
+    agent_id = Column(UUIDString, ForeignKey("agent.id"), nullable=False)
 
     # agent = relationship("AgentModel", back_populates="worker")
 
 
+# Workers for a processor in a given state, with the connection details
+# served straight from the index
+Index(
+    "ix_worker_proc_status",
+    WorkerModel.processor_id,
+    WorkerModel.status,
+    postgresql_include=["hostname", "port"],
+)
+
+
 class ContainerModel(BaseModel):
     __tablename__ = "container"
 
     container_id = Column(String(80), unique=True, nullable=False)
 
 
-class VersionModel(Base):
+class VersionModel(IdMixin, Base):
     __tablename__ = "versions"
 
-    id = Column(
-        String(40),
-        autoincrement=False,
-        default=literal_column("uuid_generate_v4()"),
-        unique=True,
-        primary_key=True,
-    )
     name = Column(String(80), unique=False, nullable=False)
-    file_id = Column(String, ForeignKey("file.id"), nullable=False)
+    file_id = Column(UUIDString, ForeignKey("file.id"), nullable=False)
     file = relationship(
         "FileModel", lazy=True, cascade="all, delete-orphan", single_parent=True
     )
     owner = Column(String(40), default=literal_column("current_user"))
-    flow = Column(Text, unique=False, nullable=False)
+    flow = deferred(Column(Text, unique=False, nullable=False), group="payload")
 
     version = Column(
-        DateTime, default=datetime.now, onupdate=datetime.now, nullable=False
+        DateTime, server_default=func.now(), onupdate=func.now(), nullable=False
     )
 
 
+@_osoclass
 class DeploymentModel(BaseModel):
     __tablename__ = "deployment"
 
     name = Column(String(80), unique=False, nullable=False)
     hostname = Column(String(80), nullable=False)
     cpus = Column(Integer, default=1, nullable=False)
-    processor_id = Column(String(40), ForeignKey("processor.id"), nullable=False)
+    processor_id = Column(UUIDString, ForeignKey("processor.id"), nullable=False)
 
     worker = relationship(
         "WorkerModel", lazy=True, uselist=False, back_populates="deployment"
     )
 
 
+Index("ix_deployment_proc", DeploymentModel.processor_id)
+
+
+@_osoclass
 class ProcessorModel(HasLogs, BaseModel):
     """
     Docstring
@@ -473,35 +919,39 @@ class ProcessorModel(HasLogs, BaseModel):
     perworker = Column(Boolean, default=True)
     timelimit = Column(Integer)
     ignoreresult = Column(Boolean)
-    serializer = Column(String(10))
+    serializer = Column(SmallCode(Serializer))
     backend = Column(String(80))
     ackslate = Column(Boolean)
     trackstarted = Column(Boolean)
     disabled = Column(Boolean)
     retrydelay = Column(Integer)
     password = Column(Boolean)
-    requirements = Column(Text)
-    endpoint = Column(Text)
-    modulepath = Column(Text)
-    icon = Column(Text)
-    cron = Column(Text)
+
+    # Large text payloads are only loaded on access or with undefer_group("payload")
+    requirements = deferred(Column(Text), group="payload")
+    endpoint = deferred(Column(Text), group="payload")
+    modulepath = deferred(Column(Text), group="payload")
+    icon = deferred(Column(Text), group="payload")
+    cron = deferred(Column(Text), group="payload")
     hasapi = Column(Boolean)
-    uistate = Column(Text)
+    uistate = deferred(Column(Text), group="payload")
 
-    description = Column(Text(), nullable=True, default="Some description")
+    description = deferred(
+        Column(Text(), nullable=True, default="Some description"), group="payload"
+    )
     container_image = Column(String(60))
     container_command = Column(String(180))
     container_version = Column(String(20), default="latest")
     use_container = Column(Boolean, default=False)
     detached = Column(Boolean, default=False)
 
-    user_id = Column(String, ForeignKey("users.id"), nullable=False)
+    user_id = Column(UUIDString, ForeignKey("users.id"), nullable=False)
     user = relationship("UserModel", backref="processor", lazy=True, cascade="all")
 
-    flow_id = Column(String(40), ForeignKey("flow.id"), nullable=True)
+    flow_id = Column(UUIDString, ForeignKey("flow.id"), nullable=True)
 
     password = relationship("PasswordModel", lazy=True, viewonly=True)
-    password_id = Column(String, ForeignKey("passwords.id"), nullable=True)
+    password_id = Column(UUIDString, ForeignKey("passwords.id"), nullable=True)
 
     plugs = relationship(
         "PlugModel", backref="processor", lazy=True, cascade="all, delete-orphan"
@@ -516,6 +966,7 @@ class ProcessorModel(HasLogs, BaseModel):
     )
 
 
+@_osoclass
 class JobModel(Base):
     __tablename__ = "jobs"
 
@@ -524,21 +975,16 @@ class JobModel(Base):
     job_state = Column(LargeBinary)
 
 
+@_osoclass
 class PasswordModel(BaseModel):
     __tablename__ = "passwords"
 
-    id = Column(
-        String(40),
-        autoincrement=False,
-        default=literal_column("uuid_generate_v4()"),
-        unique=True,
-        primary_key=True,
-    )
     password = Column(String(60), nullable=False)
 
     processor = relationship("ProcessorModel", lazy=True, uselist=False)
 
 
+@_osoclass
 class NetworkModel(BaseModel):
     __tablename__ = "network"
 
@@ -553,7 +999,7 @@ class NetworkModel(BaseModel):
         "NodeModel", backref="network", lazy=True, cascade="all, delete"
     )
 
-    user_id = Column(String, ForeignKey("users.id"), nullable=False)
+    user_id = Column(UUIDString, ForeignKey("users.id"), nullable=False)
     user = relationship("UserModel", lazy=True, cascade="all")
 
 
@@ -561,9 +1007,9 @@ class WorkModel(BaseModel):
     __tablename__ = "work"
 
     next_run_time = Column(DOUBLE_PRECISION)
-    job_state = Column(LargeBinary)
+    job_state = Column(MsgpackZstd)
 
-    task_id = Column(String(40), ForeignKey("task.id"))
+    task_id = Column(UUIDString, ForeignKey("task.id"))
     task = relationship("TaskModel", single_parent=True)
 
 
@@ -575,6 +1021,7 @@ calls_events = Table(
 )
 
 
+@_osoclass
 class CallModel(BaseModel):
     """
     Docstring
@@ -583,7 +1030,7 @@ class CallModel(BaseModel):
     __tablename__ = "call"
 
     name = Column(String(80), unique=False, nullable=False)
-    state = Column(String(10))
+    state = Column(SmallCode(CallState))
     parent = Column(String(80), nullable=True)
     taskparent = Column(String(80), nullable=True)
     resultid = Column(String(80))
@@ -591,11 +1038,11 @@ class CallModel(BaseModel):
     tracking = Column(String(80))
     argument = Column(String(40))
 
-    task_id = Column(String(40), ForeignKey("task.id"), nullable=False)
-    started = Column(DateTime, default=datetime.now, nullable=False)
+    task_id = Column(UUIDString, ForeignKey("task.id"), nullable=False)
+    started = Column(DateTime, server_default=func.now(), nullable=False)
     finished = Column(DateTime)
 
-    socket_id = Column(String(40), ForeignKey("socket.id"), nullable=False)
+    socket_id = Column(UUIDString, ForeignKey("socket.id"), nullable=False)
     socket = relationship(
         "SocketModel", back_populates="call", lazy=True, uselist=False
     )
@@ -605,6 +1052,11 @@ class CallModel(BaseModel):
     )
 
 
+# Calls for a socket, newest first
+Index("ix_call_socket_started", CallModel.socket_id, CallModel.started.desc())
+
+
+@_osoclass
 class SchedulerModel(BaseModel):
     """
     Docstring
@@ -615,7 +1067,7 @@ class SchedulerModel(BaseModel):
     nodes = relationship("NodeModel", backref="scheduler", lazy=True)
     strategy = Column("strategy", Enum(*strategies, name="strategies"))
 
-    network_id = Column(String(40), ForeignKey("network.id"))
+    network_id = Column(UUIDString, ForeignKey("network.id"))
 
 
 class SettingsModel(BaseModel):
@@ -627,6 +1079,7 @@ class SettingsModel(BaseModel):
     value = Column(String(80), nullable=False)
 
 
+@_osoclass
 class NodeModel(BaseModel):
     """
     Docstring
@@ -634,7 +1087,7 @@ class NodeModel(BaseModel):
 
     __tablename__ = "node"
     hostname = Column(String(60))
-    scheduler_id = Column(String(40), ForeignKey("scheduler.id"), nullable=True)
+    scheduler_id = Column(UUIDString, ForeignKey("scheduler.id"), nullable=True)
 
     memsize = Column(String(60), default="NaN")
     freemem = Column(String(60), default="NaN")
@@ -645,7 +1098,7 @@ class NodeModel(BaseModel):
     cpus = Column(Integer, default=0)
     cpuload = Column(Float, default=0)
 
-    network_id = Column(String(40), ForeignKey("network.id"))
+    network_id = Column(UUIDString, ForeignKey("network.id"))
 
     agent = relationship(
         "AgentModel", backref="node", uselist=False, cascade="all, delete-orphan"
@@ -660,6 +1113,7 @@ plugs_arguments = Table(
 )
 
 
+@_osoclass
 class ArgumentModel(BaseModel):
     __tablename__ = "argument"
 
@@ -667,13 +1121,14 @@ class ArgumentModel(BaseModel):
     position = Column(Integer, default=0)
     kind = Column(Integer)
 
-    task_id = Column(String(40), ForeignKey("task.id"))
+    task_id = Column(UUIDString, ForeignKey("task.id"))
 
-    user_id = Column(String, ForeignKey("users.id"), nullable=False)
+    user_id = Column(UUIDString, ForeignKey("users.id"), nullable=False)
     user = relationship("UserModel", lazy=True, cascade="all")
     plugs = relationship("PlugModel", backref="argument")
 
 
+@_osoclass
 class TaskModel(BaseModel):
     """
     Docstring
@@ -681,22 +1136,23 @@ class TaskModel(BaseModel):
 
     __tablename__ = "task"
 
-    module = Column(String(120), nullable=False, primary_key=True)
-    gitrepo = Column(String(180), nullable=False, primary_key=True)
+    module = Column(String(120), nullable=False)
+    gitrepo = Column(String(180), nullable=False)
     """
     Tasks can also be mixed-in to the module loaded by the processor as new functions
     using the code field, which must contain a function
     """
     mixin = Column(Boolean, default=False)
 
-    source = Column(Text)  # Repo module function code
-    code = Column(Text)  # Source code override for task
+    source = deferred(Column(Text), group="payload")  # Repo module function code
+    code = deferred(Column(Text), group="payload")  # Source code override for task
 
     sockets = relationship("SocketModel", back_populates="task")
 
     arguments = relationship("ArgumentModel", backref="task")
 
 
+@_osoclass
 class EventModel(BaseModel):
     """
     Events are linked to call objects: received, prerun, postrun
@@ -706,7 +1162,7 @@ class EventModel(BaseModel):
     note = Column(String(80), nullable=False)
     name = Column(String(80), nullable=False)
 
-    call_id = Column(String(40), ForeignKey("call.id"))
+    call_id = Column(UUIDString, ForeignKey("call.id"))
     call = relationship(
         "CallModel",
         back_populates="events",
@@ -715,6 +1171,9 @@ class EventModel(BaseModel):
     )
 
 
+Index("ix_event_call_id", EventModel.call_id)
+
+
 sockets_queues = Table(
     "sockets_queues",
     Base.metadata,
@@ -736,20 +1195,22 @@ plugs_target_sockets = Table(
 )
 
 
+@_osoclass
 class GateModel(BaseModel):
     __tablename__ = "gate"
 
     open = Column(Boolean)
-    task_id = Column(String(40), ForeignKey("task.id"))
+    task_id = Column(UUIDString, ForeignKey("task.id"))
 
 
+@_osoclass
 class SocketModel(BaseModel):
     """
     Docstring
     """
 
     __tablename__ = "socket"
-    processor_id = Column(String(40), ForeignKey("processor.id"), nullable=False)
+    processor_id = Column(UUIDString, ForeignKey("processor.id"), nullable=False)
 
     schedule_type = Column("schedule_type", Enum(*schedule_types, name="schedule_type"))
 
@@ -758,7 +1219,7 @@ class SocketModel(BaseModel):
 
     description = Column(Text(), nullable=True, default="Some description")
     interval = Column(Integer)
-    task_id = Column(String(40), ForeignKey("task.id"))
+    task_id = Column(UUIDString, ForeignKey("task.id"))
     task = relationship(
         "TaskModel",
         back_populates="sockets",
@@ -766,7 +1227,7 @@ class SocketModel(BaseModel):
         cascade="delete, delete-orphan",
     )
 
-    user_id = Column(String, ForeignKey("users.id"), nullable=False)
+    user_id = Column(UUIDString, ForeignKey("users.id"), nullable=False)
     user = relationship("UserModel", lazy=True, cascade="all")
 
     # Wait for all sourceplugs to deliver their data before invoking the task
@@ -791,6 +1252,7 @@ plugs_queues = Table(
 )
 
 
+@_osoclass
 class PlugModel(BaseModel):
     """
     Docstring
@@ -800,7 +1262,7 @@ class PlugModel(BaseModel):
 
     type = Column("type", Enum(*plug_types, name="plug_type"), default="RESULT")
 
-    processor_id = Column(String(40), ForeignKey("processor.id"), nullable=False)
+    processor_id = Column(UUIDString, ForeignKey("processor.id"), nullable=False)
 
     source = relationship(
         "SocketModel",
@@ -815,22 +1277,27 @@ class PlugModel(BaseModel):
         secondary=plugs_target_sockets,
         uselist=False,
     )
-    argument_id = Column(String, ForeignKey("argument.id"))
+    argument_id = Column(UUIDString, ForeignKey("argument.id"))
 
-    user_id = Column(String, ForeignKey("users.id"), nullable=False)
+    user_id = Column(UUIDString, ForeignKey("users.id"), nullable=False)
     user = relationship("UserModel", lazy=True, cascade="all")
 
     description = Column(Text(), nullable=True, default="Some description")
     queue = relationship("QueueModel", secondary=plugs_queues, uselist=False)
 
 
+# Plugs of a given type for a processor
+Index("ix_plug_proc_type", PlugModel.processor_id, PlugModel.type)
+
+
+@_osoclass
 class QueueModel(BaseModel):
     """
     Docstring
     """
 
     __tablename__ = "queue"
-    qtype = Column(String(20), nullable=False, default="direct")
+    qtype = Column(SmallCode(QueueType), nullable=False, default=QueueType.DIRECT)
     durable = Column(Boolean, default=True)
     reliable = Column(Boolean, default=True)
     auto_delete = Column(Boolean, default=True)
@@ -839,61 +1306,105 @@ class QueueModel(BaseModel):
     message_ttl = Column(Integer, default=3000)
     expires = Column(Integer, default=3000)
 
-    network_id = Column(String(40), ForeignKey("network.id"))
+    network_id = Column(UUIDString, ForeignKey("network.id"))
 
 
-class LoginModel(Base):
+@_osoclass
+class LoginModel(IdMixin, AuditMixin, Base):
     __tablename__ = "login"
 
-    id = Column(
-        String(40),
-        autoincrement=False,
-        default=literal_column("uuid_generate_v4()"),
-        unique=True,
-        primary_key=True,
-    )
-    owner = Column(String(40), default=literal_column("current_user"))
-
-    created = Column(DateTime, default=datetime.now, nullable=False)
-    lastupdated = Column(
-        DateTime, default=datetime.now, onupdate=datetime.now, nullable=False
-    )
-    login = Column(DateTime, default=datetime.now, nullable=False)
+    login = Column(DateTime, server_default=func.now(), nullable=False)
     token = Column(
         String(40),
         autoincrement=False,
         default=literal_column("uuid_generate_v4()"),
         unique=True,
-        primary_key=True,
+        nullable=False,
     )
 
-    user_id = Column(String, ForeignKey("users.id"), nullable=False)
+    user_id = Column(UUIDString, ForeignKey("users.id"), nullable=False)
     user = relationship("UserModel", lazy=True, overlaps="logins", cascade="all")
 
 
-oso.register_class(BaseModel)
-oso.register_class(PasswordModel)
-oso.register_class(UserModel)
-oso.register_class(LogModel)
-oso.register_class(ProcessorModel)
-oso.register_class(QueueModel)
-oso.register_class(SocketModel)
-oso.register_class(PlugModel)
-oso.register_class(AgentModel)
-oso.register_class(WorkerModel)
-oso.register_class(NodeModel)
-oso.register_class(FlowModel)
-oso.register_class(RoleModel)
-oso.register_class(PrivilegeModel)
-oso.register_class(ActionModel)
-oso.register_class(EventModel)
-oso.register_class(SchedulerModel)
-oso.register_class(CallModel)
-oso.register_class(TaskModel)
-oso.register_class(ArgumentModel)
-oso.register_class(NetworkModel)
-oso.register_class(GateModel)
-oso.register_class(LoginModel)
-oso.register_class(JobModel)
-oso.register_class(DeploymentModel)
-oso.register_class(FileModel)
+# Backs HasLogins.logins, which filters on user_id and sorts by created desc
+Index("ix_login_user_id_created", LoginModel.user_id, LoginModel.created.desc())
+
+
+# Per-processor child counts for dashboards. Each child table is aggregated
+# on its own before joining so the view never builds the plug x socket x
+# deployment x worker cross product
+PROCESSOR_STATS_SQL = f"""
+SELECT p.id,
+       COALESCE(pl.n, 0) AS plug_count,
+       COALESCE(s.n, 0) AS socket_count,
+       COALESCE(d.n, 0) AS deployment_count,
+       COALESCE(w.n, 0) AS running_workers
+FROM processor p
+LEFT JOIN (SELECT processor_id, COUNT(*) AS n FROM plug GROUP BY processor_id) pl
+       ON pl.processor_id = p.id
+LEFT JOIN (SELECT processor_id, COUNT(*) AS n FROM socket GROUP BY processor_id) s
+       ON s.processor_id = p.id
+LEFT JOIN (SELECT processor_id, COUNT(*) AS n FROM deployment GROUP BY processor_id) d
+       ON d.processor_id = p.id
+LEFT JOIN (SELECT processor_id, COUNT(*) AS n FROM worker
+           WHERE status = {Status.RUNNING.code} GROUP BY processor_id) w
+       ON w.processor_id = p.id
+"""
+
+event.listen(
+    Base.metadata,
+    "after_create",
+    DDL(
+        "CREATE MATERIALIZED VIEW IF NOT EXISTS processor_stats AS "
+        + PROCESSOR_STATS_SQL
+    ).execute_if(dialect="postgresql"),
+)
+# REFRESH ... CONCURRENTLY requires a unique index on the view
+event.listen(
+    Base.metadata,
+    "after_create",
+    DDL(
+        "CREATE UNIQUE INDEX IF NOT EXISTS ix_processor_stats_id ON processor_stats (id)"
+    ).execute_if(dialect="postgresql"),
+)
+event.listen(
+    Base.metadata,
+    "before_drop",
+    DDL("DROP MATERIALIZED VIEW IF EXISTS processor_stats").execute_if(
+        dialect="postgresql"
+    ),
+)
+
+# The view is created by the DDL above, so its Table lives outside
+# Base.metadata where create_all would try to create it as a table
+processor_stats = Table(
+    "processor_stats",
+    MetaData(),
+    Column("id", UUIDString, primary_key=True),
+    Column("plug_count", Integer),
+    Column("socket_count", Integer),
+    Column("deployment_count", Integer),
+    Column("running_workers", Integer),
+    info={"is_view": True},
+)
+
+
+class ProcessorStatsModel(Base):
+    """
+    Read-only counts from the processor_stats materialized view
+    """
+
+    __table__ = processor_stats
+
+
+def refresh_processor_stats(session):
+    """Recompute processor_stats without blocking readers of the view
+
+    Returns False, without refreshing, when the view has not been created
+    """
+    exists = session.execute(text("SELECT to_regclass('processor_stats')")).scalar()
+    if exists is None:
+        return False
+
+    session.execute(text("REFRESH MATERIALIZED VIEW CONCURRENTLY processor_stats"))
+    return True
@@ -23,6 +23,7 @@ from pyfi.db.model import (
     SchedulerModel,
     TaskModel,
     WorkModel,
+    refresh_processor_stats,
 )
 
 HOSTNAME = platform.node()
@@ -488,7 +489,7 @@ class DeployProcessorPlugin(SchedulerPlugin):
                                             json.dumps(
                                                 {
                                                     "processor": processor.id,
-                                                    "deployment": str(_deployment),
+                                                    "deployment": _deployment.to_json().decode(),
                                                     "action": "add",
                                                 }
                                             ),
@@ -586,7 +587,32 @@ class WatchPlugin(SchedulerPlugin):
             logging.debug("WatchPlugin: Checking plugs")
 
 
-_plugins = [NodePlugin, DeployProcessorPlugin, WorkPlugin, WatchPlugin]
+class ProcessorStatsPlugin(SchedulerPlugin):
+    """Refresh the pre-aggregated processor dashboard counts"""
+
+    refresh_interval = 10
+
+    def start(self, name, interval, *args, **kwargs):
+        return super().start(name, self.refresh_interval, *args, **kwargs)
+
+    def run(self, *args, **kwargs):
+        with get_session() as session:
+            logging.debug("ProcessorStatsPlugin: Refreshing processor stats")
+            if not refresh_processor_stats(session):
+                logging.warning(
+                    "ProcessorStatsPlugin: processor_stats view is missing, "
+                    "run the database migrations to enable it"
+                )
+                self.stop()
+
+
+_plugins = [
+    NodePlugin,
+    DeployProcessorPlugin,
+    WorkPlugin,
+    WatchPlugin,
+    ProcessorStatsPlugin,
+]
 
 
 class BasicScheduler:
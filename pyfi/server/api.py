@@ -41,6 +41,7 @@ from flask_cors import CORS, cross_origin
 from flask_restx import Api, Resource, fields, reqparse
 from jose import JWTError, jwt
 from six.moves.urllib.request import urlopen
+from sqlalchemy.orm import defaultload, undefer_group
 
 from flask_session import Session
 from pyfi.blueprints.show import blueprint
@@ -56,6 +57,7 @@ from pyfi.db.model import (
     NodeModel,
     ProcessorModel,
     QueueModel,
+    SocketModel,
     TaskModel,
     VersionModel,
     WorkerModel,
@@ -514,7 +516,12 @@ def login_processor(id):
 def do_processor(name):
     if request.method == "GET":
         with get_session() as session:
-            _processor = session.query(ProcessorModel).filter_by(name=name).first()
+            _processor = (
+                session.query(ProcessorModel)
+                .options(undefer_group("payload"))
+                .filter_by(name=name)
+                .first()
+            )
             if _processor is None:
                 return f"Processor {name} not found", 404
 
@@ -627,7 +634,9 @@ def execute_flow():
 def get_processors():
     """Example endpoint returning a list of processors"""
     with get_session() as session:
-        processors = session.query(ProcessorModel).all()
+        processors = (
+            session.query(ProcessorModel).options(undefer_group("payload")).all()
+        )
 
         return jsonify(processors)
 
@@ -750,6 +759,7 @@ def get_files(collection, path):
             try:
                 files = (
                     session.query(FileModel)
+                    .options(undefer_group("payload"))
                     .filter_by(collection=collection, path=path, user=_user)
                     .all()
                 )
@@ -757,6 +767,7 @@ def get_files(collection, path):
                 session.rollback()
                 files = (
                     session.query(FileModel)
+                    .options(undefer_group("payload"))
                     .filter_by(collection=collection, path=path, user=_user)
                     .all()
                 )
@@ -1041,7 +1052,7 @@ def get_workers_():
 @requires_auth
 def get_tasks():
     with get_session() as session:
-        tasks = session.query(TaskModel).all()
+        tasks = session.query(TaskModel).options(undefer_group("payload")).all()
         return jsonify(tasks)
 
 
@@ -1060,7 +1071,23 @@ def get_nodes():
 def get_networks():
     with get_session() as session:
         networks = []
-        _networks = session.query(NetworkModel).all()
+        # The tree embeds full processor and task JSON, payload columns included
+        processor = (
+            defaultload(NetworkModel.nodes)
+            .defaultload(NodeModel.agent)
+            .defaultload(AgentModel.workers)
+            .defaultload(WorkerModel.processor)
+        )
+        _networks = (
+            session.query(NetworkModel)
+            .options(
+                processor.undefer_group("payload"),
+                processor.defaultload(ProcessorModel.sockets)
+                .defaultload(SocketModel.task)
+                .undefer_group("payload"),
+            )
+            .all()
+        )
 
         for network in _networks:
             _network = {
@@ -1212,7 +1239,10 @@ def get_versions(flowid):
     with get_session() as session:
         logging.info("Getting versions for %s", flowid)
         versions = (
-            session.query(VersionModel).filter(VersionModel.file_id == flowid).all()
+            session.query(VersionModel)
+            .options(undefer_group("payload"))
+            .filter(VersionModel.file_id == flowid)
+            .all()
         )
         logging.info("Got versions for %s %s", flowid, versions)
 
@@ -0,0 +1,50 @@
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.dialects.postgresql import BIT, DOUBLE_PRECISION, UUID
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session, configure_mappers
+
+from pyfi.db.model.models import Base
+
+
+# Let the PostgreSQL-only column types create and round trip on sqlite
+@compiles(UUID, "sqlite")
+def _uuid(type_, compiler, **kw):
+    return "CHAR(36)"
+
+
+@compiles(BIT, "sqlite")
+def _bit(type_, compiler, **kw):
+    return "TEXT"
+
+
+@compiles(DOUBLE_PRECISION, "sqlite")
+def _double(type_, compiler, **kw):
+    return "REAL"
+
+
+@pytest.fixture
+def engine():
+    configure_mappers()
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def session(engine):
+    with Session(engine) as session:
+        yield session
+
+
+@pytest.fixture
+def statements(engine):
+    """Records every SQL statement the engine executes"""
+    executed = []
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def record(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    return executed
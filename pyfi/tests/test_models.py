@@ -0,0 +1,195 @@
+import json
+import pickle
+import uuid
+
+import orjson
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from pyfi.db.model.models import (
+    AlchemyEncoder,
+    MsgpackZstd,
+    PrivilegeModel,
+    ProcessorModel,
+    QueueModel,
+    QueueType,
+    Right,
+    RightsType,
+    RoleModel,
+    SchedulerModel,
+    SmallCode,
+    Status,
+    UserModel,
+    WorkModel,
+)
+
+
+def _id():
+    return str(uuid.uuid4())
+
+
+def _privilege(right):
+    return PrivilegeModel(id=_id(), name=f"{right}-{_id()}", owner="test", right=right)
+
+
+def _user(**kwargs):
+    return UserModel(
+        id=_id(), owner="test", email=f"{_id()}@test", password="p", clear="p", **kwargs
+    )
+
+
+def test_encoder_reloads_expired_instance(session, statements):
+    scheduler = SchedulerModel(id=_id(), name="s", owner="test", strategy="BALANCED")
+    session.add(scheduler)
+    session.commit()
+
+    statements.clear()
+    data = json.loads(json.dumps(scheduler, cls=AlchemyEncoder))
+
+    assert len(statements) == 1
+    assert data["id"] == scheduler.id
+    assert data["name"] == "s"
+    assert data["strategy"] == "BALANCED"
+
+
+def test_encoder_includes_deferred_payload(engine, session):
+    user = _user(name="carol")
+    processor = ProcessorModel(
+        id=_id(), name="p", owner="test", module="m", requirements="r", user=user
+    )
+    session.add(processor)
+    session.commit()
+
+    with Session(engine) as fresh:
+        processor = fresh.query(ProcessorModel).one()
+        assert "requirements" not in processor.__dict__
+
+        data = json.loads(json.dumps(processor, cls=AlchemyEncoder))
+        assert data["name"] == "p"
+        assert data["requirements"] == "r"
+
+
+def test_user_fetch_statement_count(engine, session, statements):
+    roles = [
+        RoleModel(id=_id(), name=name, owner="test", privileges=[_privilege(right)])
+        for name, right in (("admin", "READ_USER"), ("viewer", "READ_QUEUE"))
+    ]
+    user = _user(
+        name="alice",
+        roles=roles,
+        privileges=[_privilege("READ_LOG")],
+        revoked=[_privilege("READ_USER")],
+    )
+    session.add(user)
+    session.commit()
+
+    with Session(engine) as fresh:
+        statements.clear()
+        user = fresh.query(UserModel).filter_by(name="alice").one()
+        user.privileges, user.revoked, [role.privileges for role in user.roles]
+
+        # the user, then one selectin each for privileges, revoked, roles and
+        # the roles' privileges, regardless of how many rows they hold. Each
+        # fetches by primary key rather than re-running the user query
+        assert len(statements) == 5
+        assert all(" IN (" in statement for statement in statements[1:])
+        assert user.has_right(Right.READ_LOG)
+        assert not user.has_right(Right.READ_USER)
+
+
+
+def test_small_code_round_trip(session):
+    session.add(QueueModel(id=_id(), name="q", owner="test", qtype="topic"))
+    session.commit()
+
+    stored = session.execute(text("SELECT qtype, status FROM queue")).one()
+    assert tuple(stored) == (QueueType.TOPIC.code, Status.READY.code)
+
+    session.expire_all()
+    loaded = session.query(QueueModel).one()
+    assert loaded.qtype is QueueType.TOPIC
+    assert loaded.status is Status.READY
+
+
+def test_small_code_uses_explicit_codes():
+    small = SmallCode(Status)
+
+    for member in Status:
+        assert small.process_bind_param(member.value, None) == member.code
+        assert small.process_result_value(member.code, None) is member
+
+    assert small.process_bind_param(None, None) is None
+
+def test_rights_mask_follows_privileges():
+    privilege = _privilege("READ_LOG")
+    role = RoleModel(id=_id(), name="r", owner="test", privileges=[privilege])
+    role.privileges.append(privilege)
+
+    role.privileges.remove(privilege)
+    assert role.rights == Right.READ_LOG
+
+    role.privileges.remove(privilege)
+    assert role.rights == Right(0)
+
+
+def test_rights_type_round_trip(session):
+    mask = Right.ALL | Right.READ_USER
+    session.add(_user(name="bob", rights_granted=mask))
+    session.commit()
+    session.expire_all()
+
+    assert session.query(UserModel).one().rights_granted == mask
+
+    rights = RightsType()
+    assert (
+        rights.process_result_value(rights.process_bind_param(mask, None), None) == mask
+    )
+
+
+def test_msgpack_zstd_round_trip(session):
+    state = {"func": "run", "args": [1, 2], "blob": b"\x00\x01"}
+    session.add(WorkModel(id=_id(), name="w", owner="test", job_state=state))
+    session.commit()
+    session.expire_all()
+
+    assert session.query(WorkModel).one().job_state == state
+
+
+def test_msgpack_zstd_reads_legacy_pickle():
+    state = {"func": "run", "args": (1, 2)}
+
+    assert MsgpackZstd().process_result_value(pickle.dumps(state), None) == state
+
+
+def test_to_json_reloads_expired_instance(session, statements):
+    oid = _id()
+    scheduler = SchedulerModel(id=oid, name="s", owner="test", strategy="BALANCED")
+    session.add(scheduler)
+    session.commit()
+
+    statements.clear()
+    assert repr(scheduler) == f"<SchedulerModel id={oid} name=None>"
+    assert statements == []
+
+    data = orjson.loads(scheduler.to_json())
+    assert data["id"] == oid
+    assert data["name"] == "s"
+    assert data["status"] == "ready"
+    assert len(statements) == 1
+
+
+def test_to_json_includes_deferred_payload(engine, session):
+    user = _user(name="dave")
+    processor = ProcessorModel(
+        id=_id(), name="p", owner="test", module="m", requirements="r", user=user
+    )
+    session.add(processor)
+    session.commit()
+
+    with Session(engine) as fresh:
+        processor = fresh.query(ProcessorModel).one()
+        assert "requirements" not in processor.__dict__
+
+        data = orjson.loads(processor.to_json())
+        assert data["name"] == "p"
+        assert data["requirements"] == "r"
@@ -46,6 +46,7 @@ from sqlalchemy.pool import QueuePool
 
 from pyfi.db import get_session
 from pyfi.db.model import (
+    QUERY_CACHE_SIZE,
     AgentModel,
     CallModel,
     EventModel,
@@ -100,7 +101,12 @@ DBURI = CONFIG.get("database", "uri")
 # Create database engine
 # , isolation_level='READ UNCOMMITTED'
 DATABASE = create_engine(
-    DBURI, pool_size=1, max_overflow=5, pool_recycle=3600, poolclass=QueuePool
+    DBURI,
+    pool_size=1,
+    max_overflow=5,
+    pool_recycle=3600,
+    poolclass=QueuePool,
+    query_cache_size=QUERY_CACHE_SIZE,
 )
 
 events_server = os.environ["EVENTS"] if "EVENTS" in os.environ else "localhost"
@@ -396,7 +402,7 @@ class WorkerService:
                 session.query(ProcessorModel).filter_by(id=self.processorid).first()
             )
 
-            self.data = json.loads(str(_processor))
+            self.data = json.loads(_processor.to_json())
             """
             self.deployment = deployment = (
                 session.query(DeploymentModel).filter_by(name=deployment.name).first()
@@ -180,12 +180,15 @@ setup(
         'rejson',
         # 'simpy',
         'newrelic',
+        'msgpack',
+        'orjson',
         'oso',
         'sqlalchemy-oso',
         'pyschedule',
         'uvicorn[standard]',
         'psycopg2',
-        'docker'
+        'docker',
+        'zstandard'
         # 'sphinx-material @ git+https://github.com/radiantone/sphinx-material'
     ],
     license=about['__license__'],